@@ -1,8 +1,11 @@
 import streamlit as st
+import html
+import math
+import numpy as np
 import tempfile
 import os
 from scrapper import GitHubScraper
-from llm_summarizer import LLM_Summarize
+from llm_summarizer import LLM_Summarize, DEFAULT_MODEL_NAME
 import logging
 from pathlib import Path
 import time
@@ -168,38 +171,38 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_summarizer(model_name: str = DEFAULT_MODEL_NAME) -> LLM_Summarize:
+    """Load the summarization model once per process and share it across runs"""
+    return LLM_Summarize(model_name)
+
+# Number of file summaries rendered per page
+FILES_PER_PAGE = 50
+
+# Minimum number of seconds between progress bar updates
+PROGRESS_INTERVAL = 0.1
+
+# CSS class for each language badge
+LANGUAGE_CLASSES = {
+    'python': 'python',
+    'javascript': 'javascript',
+    'typescript': 'typescript',
+    'java': 'java',
+    'c++': 'cpp',
+    'c': 'c',
+    'go': 'go',
+    'ruby': 'ruby',
+    'html': 'html',
+    'css': 'css',
+    'markdown': 'markdown',
+    'json': 'json',
+    'xml': 'xml',
+    'yaml': 'yaml'
+}
+
 def get_language_class(language: str) -> str:
     """Get CSS class for language badge"""
-    language = language.lower()
-    if language == 'python':
-        return 'python'
-    elif language == 'javascript':
-        return 'javascript'
-    elif language == 'typescript':
-        return 'typescript'
-    elif language == 'java':
-        return 'java'
-    elif language == 'c++':
-        return 'cpp'
-    elif language == 'c':
-        return 'c'
-    elif language == 'go':
-        return 'go'
-    elif language == 'ruby':
-        return 'ruby'
-    elif language == 'html':
-        return 'html'
-    elif language == 'css':
-        return 'css'
-    elif language == 'markdown':
-        return 'markdown'
-    elif language == 'json':
-        return 'json'
-    elif language == 'xml':
-        return 'xml'
-    elif language == 'yaml':
-        return 'yaml'
-    return 'unknown'
+    return LANGUAGE_CLASSES.get(language.lower(), 'unknown')
 
 def format_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
@@ -209,18 +212,36 @@ def format_size(size_bytes: int) -> str:
         size_bytes /= 1024.0
     return f"{size_bytes:.1f} TB"
 
-def display_stats(summaries):
+def build_file_table(summaries):
+    """Split the per-file summaries into column arrays for statistics and filtering"""
+    files = [s for s in summaries if s['path'] != 'REPOSITORY_SUMMARY']
+    languages = sorted({s['language'] for s in files if 'language' in s})
+    language_ids = {lang: i for i, lang in enumerate(languages)}
+    
+    return {
+        'files': files,
+        'paths': [s['path'] for s in files],
+        # Lowercased once so the search box doesn't re-lowercase every path per rerun
+        'lowered_paths': [s['path'].lower() for s in files],
+        'sizes': np.fromiter((s.get('size', 0) for s in files), dtype=np.int64, count=len(files)),
+        'locs': np.fromiter((s.get('loc', 0) for s in files), dtype=np.int64, count=len(files)),
+        'languages': languages,
+        # -1 marks files without a detected language
+        'language_ids': np.fromiter(
+            (language_ids.get(s.get('language'), -1) for s in files), dtype=np.int16, count=len(files)
+        )
+    }
+
+def display_stats(table):
     """Display repository statistics"""
-    total_files = len([s for s in summaries if s['path'] != 'REPOSITORY_SUMMARY'])
-    total_size = sum(s['size'] for s in summaries if s['path'] != 'REPOSITORY_SUMMARY')
-    total_loc = sum(s.get('loc', 0) for s in summaries if s['path'] != 'REPOSITORY_SUMMARY')
+    total_files = len(table['files'])
+    total_size = int(table['sizes'].sum())
+    total_loc = int(table['locs'].sum())
     
     # Count files by language
-    language_counts = {}
-    for s in summaries:
-        if s['path'] != 'REPOSITORY_SUMMARY' and 'language' in s:
-            lang = s['language']
-            language_counts[lang] = language_counts.get(lang, 0) + 1
+    language_ids = table['language_ids']
+    counts = np.bincount(language_ids[language_ids >= 0], minlength=len(table['languages']))
+    language_counts = {lang: int(count) for lang, count in zip(table['languages'], counts) if count}
     
     # Display stats in columns
     col1, col2, col3, col4 = st.columns(4)
@@ -278,29 +299,82 @@ def display_stats(summaries):
 
 def display_file_summary(summary):
     """Display a single file summary in a formatted box"""
+    # Build the whole box up front so it is sent to the browser as one element
+    # Entries for files that failed to process only carry their path and the error
+    parts = [f"<div class='file-box'><h3>{html.escape(summary['path'])}</h3>"]
+    
+    if 'type' in summary:
+        parts.append(f"<p><strong>Type:</strong> {html.escape(summary['type'])}</p>")
+    
+    if 'size' in summary:
+        parts.append(f"<p><strong>Size:</strong> {format_size(summary['size'])}</p>")
+    
+    if 'language' in summary:
+        lang_class = get_language_class(summary['language'])
+        parts.append(f"<p><strong>Language:</strong> <span class='language-badge {lang_class}'>{html.escape(summary['language'])}</span></p>")
+    
+    if 'loc' in summary:
+        parts.append(f"<p><strong>Lines of Code:</strong> {summary['loc']:,}</p>")
+    
+    if summary.get('is_text') and summary.get('summary'):
+        parts.append("<p><strong>Summary:</strong></p>")
+        parts.append(f"<div class='summary-box'>{html.escape(summary['summary'])}</div>")
+    
+    parts.append("</div>")
+    
     with st.container():
-        st.markdown(f"""
-            <div class="file-box">
-                <h3>{summary['path']}</h3>
-                <p><strong>Type:</strong> {summary['type']}</p>
-                <p><strong>Size:</strong> {format_size(summary['size'])}</p>
-        """, unsafe_allow_html=True)
-        
-        if 'language' in summary:
-            lang_class = get_language_class(summary['language'])
-            st.markdown(f"<p><strong>Language:</strong> <span class='language-badge {lang_class}'>{summary['language']}</span></p>", unsafe_allow_html=True)
-        
-        if 'loc' in summary:
-            st.markdown(f"<p><strong>Lines of Code:</strong> {summary['loc']:,}</p>", unsafe_allow_html=True)
-        
-        if summary['is_text'] and summary['summary']:
-            st.markdown("<p><strong>Summary:</strong></p>", unsafe_allow_html=True)
-            st.markdown(f"<div class='summary-box'>{summary['summary']}</div>", unsafe_allow_html=True)
+        st.markdown("".join(parts), unsafe_allow_html=True)
         
         if 'error' in summary:
             st.error(f"Error: {summary['error']}")
-        
-        st.markdown("</div>", unsafe_allow_html=True)
+
+def make_progress_callback(progress_bar):
+    """Build a progress callback that redraws the bar at most every PROGRESS_INTERVAL seconds"""
+    last_update = 0.0
+    
+    def update(done: int, total: int, stage: str):
+        nonlocal last_update
+        now = time.monotonic()
+        if done < total and now - last_update < PROGRESS_INTERVAL:
+            return
+        last_update = now
+        progress_bar.progress(done / total if total else 1.0, text=f"{stage} ({done}/{total})")
+    
+    return update
+
+def display_results(summaries, table, analyzed_files):
+    """Display the repository overview, statistics and a page of file summaries"""
+    # Find and display repository summary first
+    repo_summary = next((s for s in summaries if s['path'] == 'REPOSITORY_SUMMARY'), None)
+    if repo_summary:
+        st.markdown("## 📝 Repository Overview")
+        st.markdown(repo_summary['summary'], unsafe_allow_html=True)
+    
+    # Display repository statistics
+    display_stats(table)
+    
+    # Display file summaries
+    st.markdown(f"## 📁 File Analysis ({analyzed_files} files)")
+    
+    # Add a search box for filtering files
+    search_query = st.text_input("🔍 Search files", placeholder="Type to filter files...")
+    query = search_query.lower() if search_query else None
+    if query:
+        matches = [i for i, path in enumerate(table['lowered_paths']) if query in path]
+    else:
+        matches = range(len(table['files']))
+    
+    # Only render the requested page
+    page_count = max(1, math.ceil(len(matches) / FILES_PER_PAGE))
+    page = min(int(st.number_input("Page", min_value=1, value=1, step=1)), page_count)
+    st.caption(f"Page {page} of {page_count} ({len(matches)} matching files)")
+    
+    start = (page - 1) * FILES_PER_PAGE
+    for i in matches[start:start + FILES_PER_PAGE]:
+        display_file_summary(table['files'][i])
+    
+    if not matches:
+        st.info("No files match your search.")
 
 def main():
     st.title("📊 GitHub Repository Analyzer")
@@ -317,72 +391,43 @@ def main():
             st.error("Please enter a GitHub repository URL")
             return
 
+        # Drop the previous repository's results, so a failed run doesn't show them
+        st.session_state.pop('analysis', None)
+
         try:
-            # Create a placeholder for the progress bar
-            progress_placeholder = st.empty()
-            status_placeholder = st.empty()
-            
-            with st.spinner("Initializing..."):
-                # Initialize the scraper
-                scraper = GitHubScraper()
-                
-                # Clone repository
-                progress_placeholder.progress(20)
-                status_placeholder.text("Cloning repository...")
-                scraper.clone_repository(repo_url)
-                
-                # Get files to analyze
-                progress_placeholder.progress(40)
-                status_placeholder.text("Scanning repository...")
-                files_to_analyze = scraper.get_all_files()
-                total_files = len(files_to_analyze)
-                
-                if total_files == 0:
-                    st.warning("No files found to analyze in the repository.")
-                    return
-                
-                # Analyze repository
-                progress_placeholder.progress(60)
-                status_placeholder.text(f"Analyzing {total_files} files...")
-                summaries, analyzed_files = scraper.analyze_repository(repo_url)
-                
-                # Display results
-                progress_placeholder.progress(80)
-                status_placeholder.text("Generating summaries...")
-                
-                # Find and display repository summary first
-                repo_summary = next((s for s in summaries if s['path'] == 'REPOSITORY_SUMMARY'), None)
-                if repo_summary:
-                    st.markdown("## 📝 Repository Overview")
-                    st.markdown(repo_summary['summary'], unsafe_allow_html=True)
-                
-                # Display repository statistics
-                display_stats(summaries)
-                
-                # Display file summaries
-                st.markdown(f"## 📁 File Analysis ({analyzed_files} files)")
-                
-                # Add a search box for filtering files
-                search_query = st.text_input("🔍 Search files", placeholder="Type to filter files...")
-                
-                # Filter and display file summaries
-                filtered_summaries = [
-                    s for s in summaries 
-                    if s['path'] != 'REPOSITORY_SUMMARY' and 
-                    (not search_query or search_query.lower() in s['path'].lower())
-                ]
-                
-                for summary in filtered_summaries:
-                    display_file_summary(summary)
-                
-                progress_placeholder.progress(100)
-                status_placeholder.text("Analysis complete!")
-                st.success(f"Successfully analyzed {analyzed_files} files!")
+            with st.status("Loading model...", expanded=True) as status:
+                # Initialize the scraper, its clone is removed once the analysis is done
+                with GitHubScraper(summarizer=get_summarizer()) as scraper:
+                    # Clone repository
+                    status.update(label="Cloning repository...")
+                    scraper.clone_repository(repo_url)
+                    
+                    # Analyze repository, reporting real progress from the scraper
+                    status.update(label="Analyzing repository...")
+                    progress_bar = st.progress(0.0)
+                    summaries, analyzed_files = scraper.analyze_repository(
+                        repo_url, progress_callback=make_progress_callback(progress_bar)
+                    )
+                    
+                    if analyzed_files == 0:
+                        status.update(label="No files found", state="error")
+                        st.warning("No files found to analyze in the repository.")
+                        return
+                    
+                    # Keep the results around so the search box and pager work across reruns
+                    st.session_state['analysis'] = (summaries, build_file_table(summaries), analyzed_files)
+                    
+                progress_bar.progress(1.0, text="Analysis complete!")
+                status.update(label="Analysis complete!", state="complete", expanded=False)
+            st.success(f"Successfully analyzed {analyzed_files} files!")
                 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
             logger.error(f"Error in main: {e}")
 
+    if 'analysis' in st.session_state:
+        display_results(*st.session_state['analysis'])
+
     # Add footer
     st.markdown("---")
     st.markdown("""
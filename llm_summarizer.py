@@ -1,7 +1,12 @@
+import bisect
+import copy
+import hashlib
 import logging
-from typing import List, Dict
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
 from pathlib import Path
 import re
 
@@ -11,34 +16,133 @@ logging.basicConfig(
 )
 logger = logging.getLogger("GenerateSummary")
 
+# Distilled BART keeps CNN summarization quality with half the decoder layers
+DEFAULT_MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+
+# Greedy decoding: short summaries gain little from the model's default 4 beams
+GENERATION_KWARGS = {
+    'num_beams': 1,
+    'do_sample': False,
+    'use_cache': True,
+    'no_repeat_ngram_size': 3
+}
+
+# Files shorter than this after preprocessing are not sent to the model
+MIN_CODE_CHARS = 200
+MIN_CODE_LINES = 5
+
+# Summaries returned for files that were not (or could not be) summarized
+EMPTY_FILE_SUMMARY = "Empty file"
+SHORT_FILE_SUMMARY = "File too short - skipping summary"
+ERROR_SUMMARY = "Error generating summary"
+PLACEHOLDER_SUMMARIES = frozenset({EMPTY_FILE_SUMMARY, SHORT_FILE_SUMMARY, ERROR_SUMMARY})
+
+# Maximum number of file summaries remembered by content hash
+SUMMARY_CACHE_SIZE = 4096
+
+# Token lengths of the intermediate summaries that condense file summaries too long
+# for a single repository summary input
+REDUCE_MAX_LENGTH = 150
+REDUCE_MIN_LENGTH = 40
+
+# Chunk length boundaries (in characters) splitting chunks into batches of similar length
+CHUNK_LENGTH_BINS = (500, 1500, 3000)
+
+# Line comments (#, //) and the start of block comments (/*)
+_COMMENT_RE = re.compile(r'#[^\n]*|//[^\n]*|/\*')
+
+def _strip_comments(code: str) -> str:
+    """Remove line and block comments from code in a single linear scan"""
+    pieces = []
+    pos = 0
+    # Once a "/*" has no closing "*/" after it, no later "/*" can have one either
+    has_closer = True
+    while True:
+        match = _COMMENT_RE.search(code, pos)
+        if not match:
+            break
+        end = match.end()
+        if match.group() == '/*':
+            close = code.find('*/', end) if has_closer else -1
+            if close == -1:
+                # Unterminated block comment: keep the text as is
+                has_closer = False
+                pieces.append(code[pos:end])
+                pos = end
+                continue
+            end = close + 2
+        pieces.append(code[pos:match.start()])
+        pos = end
+    pieces.append(code[pos:])
+    return ''.join(pieces)
+
+# Terms highlighted in the formatted repository summary
+_KEY_TERMS_RE = re.compile(r'\b(Project|Features|Technologies|Architecture|Components)\b')
+
 class LLM_Summarize:
     """Perform all LLM operations using Hugging Face models"""
 
-    def __init__(self, model_name: str = "facebook/bart-large-cnn", device: str = None):
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, device: str = None, batch_size: int = None,
+                 quantize: bool = True):
         """
         Initialize the summarizer with a Hugging Face model
         
         Args:
             model_name: Name of the Hugging Face model to use
             device: Device to run the model on ('cuda' or 'cpu'). If None, will use GPU if available
+            batch_size: Number of chunks per forward pass. If None, 8 on GPU and 2 on CPU
+            quantize: Quantize linear layers to int8 when running on CPU
         """
+        # Imported here so that importing this module (and booting the app) stays cheap
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
         self.device = device if device else ('cuda' if torch.cuda.is_available() else 'cpu')
-        logger.info(f"Using device: {self.device}")
+        self.batch_size = batch_size if batch_size else (8 if self.device == 'cuda' else 2)
+        logger.info(f"Using device: {self.device} (batch size {self.batch_size})")
         
         try:
+            self.model_name = model_name
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-            self.summarizer = pipeline(
-                "summarization",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=0 if self.device == 'cuda' else -1
+            # A fast tokenizer reconfigures its Rust backend (truncation, padding) on every
+            # call, so sharing it between threads races. The generation path keeps
+            # self.tokenizer and every chunking thread works on its own copy of it
+            self._chunk_tokenizers = threading.local()
+            # Long-lived so the per-thread tokenizers survive from one batch to the next
+            self._prepare_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+            # Transformers picks SDPA attention on its own where the architecture supports it.
+            # Weights are materialized directly in the target dtype, half precision on the
+            # GPU, without an extra full-size staging copy on the CPU
+            self.model = AutoModelForSeq2SeqLM.from_pretrained(
+                model_name,
+                torch_dtype=torch.float16 if self.device == 'cuda' else torch.float32,
+                low_cpu_mem_usage=True
             )
+            if self.device == 'cuda':
+                torch.backends.cuda.matmul.allow_tf32 = True
+                self.model = self.model.to(self.device)
+            elif quantize:
+                # Dynamic int8 linear layers use the CPU's integer dot-product kernels.
+                # Quantizing is only an optimization, so keep the fp32 model if it fails
+                try:
+                    self.model = torch.ao.quantization.quantize_dynamic(
+                        self.model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not quantize model, using fp32: {e}")
+            self.model.eval()
+            if self.device == 'cuda':
+                # Warm up the GPU kernels so the first analysis doesn't pay for their setup
+                self._summarize(["def warmup():\n    return None"], max_length=8, min_length=1)
             logger.info(f"Successfully loaded model: {model_name}")
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             raise
 
+        # Summaries of already seen file contents, shared across analyses
+        self._summary_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
         # Prompts for different summarization tasks
         self.code_summary_prompt = """Analyze and summarize the following code. Focus on:
         1. Main functionality
@@ -66,90 +170,219 @@ class LLM_Summarize:
 
     def _preprocess_code(self, code: str) -> str:
         """Preprocess code to make it more suitable for summarization"""
-        # Remove excessive whitespace
-        code = re.sub(r'\n\s*\n', '\n', code)
-        
-        # Remove comments
-        code = re.sub(r'#.*$', '', code, flags=re.MULTILINE)
-        code = re.sub(r'//.*$', '', code, flags=re.MULTILINE)
-        code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
-        
-        # Remove empty lines
-        code = '\n'.join(line for line in code.split('\n') if line.strip())
-        
-        return code
+        # Remove comments in a single scan, then drop blank lines
+        code = _strip_comments(code)
+        return '\n'.join(line for line in code.splitlines() if line.strip())
+
+    def _get_chunk_tokenizer(self):
+        """Get this thread's tokenizer for chunking, copying it on first use."""
+        tokenizer = getattr(self._chunk_tokenizers, 'tokenizer', None)
+        if tokenizer is None:
+            tokenizer = self._chunk_tokenizers.tokenizer = copy.deepcopy(self.tokenizer)
+        return tokenizer
 
     def _chunk_text(self, text: str, max_length: int = 1000) -> List[str]:
         """Split text into chunks that fit within model's context window"""
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for word in words:
-            word_length = len(self.tokenizer.encode(word))
-            if current_length + word_length > max_length:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_length = word_length
-            else:
-                current_chunk.append(word)
-                current_length += word_length
+        # Tokenize once and cut on token counts, mapping back to the text via offsets
+        encoding = self._get_chunk_tokenizer()(text, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoding["offset_mapping"]
         
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
+        chunks = []
+        for lo in range(0, len(offsets), max_length):
+            hi = min(lo + max_length, len(offsets))
+            chunk = text[offsets[lo][0]:offsets[hi - 1][1]].strip()
+            if chunk:
+                chunks.append(chunk)
         
         return chunks
 
-    def summarize_code(self, code: str) -> str:
-        """Generate a summary for a single code file"""
+    def _summarize(self, texts: List[str], max_length: int, min_length: int,
+                   batch_size: Optional[int] = None) -> List[str]:
+        """Generate summaries for a list of texts, batch_size at a time"""
+        import torch
+
+        batch_size = batch_size if batch_size else self.batch_size
+        summaries = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.tokenizer.model_max_length,
+                return_tensors="pt"
+            )
+            if self.device == 'cuda':
+                # Pinned host memory lets the copy to the GPU run asynchronously
+                inputs = {name: tensor.pin_memory().to(self.device, non_blocking=True)
+                          for name, tensor in inputs.items()}
+            with torch.inference_mode():
+                output_ids = self.model.generate(
+                    **inputs,
+                    max_length=max_length,
+                    min_length=min_length,
+                    **GENERATION_KWARGS
+                )
+            summaries.extend(self.tokenizer.batch_decode(output_ids, skip_special_tokens=True))
+        return summaries
+
+    def _prepare_code(self, code: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Preprocess and chunk a code file for summarization
+
+        Returns:
+            Tuple[Optional[str], List[str]]: Placeholder summary for files that are not
+            worth summarizing (or None), and the chunks to summarize
+        """
         try:
             if not code.strip():
-                return "Empty file"
+                return EMPTY_FILE_SUMMARY, []
 
             # Preprocess the code
             code = self._preprocess_code(code)
             
-            # Skip if content is too short
-            if len(code.split('\n')) <= 1:
-                return "Single line file - skipping summary"
+            # Skip if content is too short to be worth a model call
+            if len(code) < MIN_CODE_CHARS or code.count('\n') < MIN_CODE_LINES:
+                return SHORT_FILE_SUMMARY, []
 
             # Split code into chunks if it's too long
-            chunks = self._chunk_text(code)
-            summaries = []
-            
-            for chunk in chunks:
-                summary = self.summarizer(
-                    chunk,
-                    max_length=46,
-                    min_length=30,
-                    do_sample=False
-                )[0]['summary_text']
-                summaries.append(summary)
-            
-            return ' '.join(summaries)
+            return None, self._chunk_text(code)
+        except Exception as e:
+            logger.error(f"Error preparing code: {e}")
+            return ERROR_SUMMARY, []
+
+    def _content_key(self, code: str) -> bytes:
+        """Hash file content so identical files share one cached summary"""
+        return hashlib.blake2b(code.encode(), digest_size=16).digest()
+
+    def _get_cached_summary(self, key: bytes) -> Optional[str]:
+        """Look up a previously generated summary by content key"""
+        with self._cache_lock:
+            summary = self._summary_cache.get(key)
+            if summary is not None:
+                self._summary_cache.move_to_end(key)
+            return summary
+
+    def _cache_summary(self, key: bytes, summary: str) -> None:
+        """Remember a generated summary, evicting the least recently used one"""
+        with self._cache_lock:
+            self._summary_cache[key] = summary
+            self._summary_cache.move_to_end(key)
+            if len(self._summary_cache) > SUMMARY_CACHE_SIZE:
+                self._summary_cache.popitem(last=False)
+
+    def summarize_code(self, code: str) -> str:
+        """Generate a summary for a single code file"""
+        return self.summarize_code_batch([code])[0]
+
+    def summarize_code_batch(self, code_list: List[str], batch_size: Optional[int] = None,
+                             progress_callback: Optional[Callable[[int, int, str], None]] = None) -> List[str]:
+        """
+        Generate summaries for several code files, batching their chunks through the model
+        
+        Args:
+            code_list: List of code contents from different files
+            batch_size: Number of chunks per forward pass. If None, uses the summarizer's batch size
+            progress_callback: Called as (done, total, stage) as file summaries complete
+        
+        Returns:
+            List[str]: One summary per file, in the same order as code_list
+        """
+        # Only files whose content hasn't been summarized yet go through the model,
+        # and identical files are summarized once
+        keys = [self._content_key(code) for code in code_list]
+        summaries_by_key = {}
+        uncached = {}
+        for key, code in zip(keys, code_list):
+            cached = self._get_cached_summary(key)
+            if cached is not None:
+                summaries_by_key[key] = cached
+            else:
+                uncached.setdefault(key, code)
+
+        # Preprocess and chunk files on a thread pool while the model summarizes
+        # whichever chunks are already prepared, batch_size at a time. Chunks are
+        # binned by length so a batch isn't padded out to one long chunk
+        batch_size = batch_size if batch_size else self.batch_size
+        grouped = {}
+        chunk_counts = {}
+        failed = set()
+        bins = [([], []) for _ in range(len(CHUNK_LENGTH_BINS) + 1)]
+
+        def flush(bin_chunks, bin_owners, files_done):
+            try:
+                chunk_summaries = self._summarize(bin_chunks, max_length=46, min_length=30,
+                                                  batch_size=batch_size)
+                for (key, index), summary in zip(bin_owners, chunk_summaries):
+                    grouped.setdefault(key, {})[index] = summary
+            except Exception as e:
+                # Only the files with a chunk in this batch lose their summary
+                logger.error(f"Error summarizing code: {e}")
+                failed.update(key for key, _ in bin_owners)
+            bin_chunks.clear()
+            bin_owners.clear()
+            if progress_callback:
+                progress_callback(files_done, len(uncached), "Summarizing files")
+
+        try:
+            prepared = self._prepare_pool.map(self._prepare_code, uncached.values())
+            for files_done, (key, (placeholder, chunks)) in enumerate(zip(uncached, prepared), 1):
+                if placeholder:
+                    summaries_by_key[key] = placeholder
+                chunk_counts[key] = len(chunks)
+                for index, chunk in enumerate(chunks):
+                    bin_chunks, bin_owners = bins[bisect.bisect_right(CHUNK_LENGTH_BINS, len(chunk))]
+                    bin_chunks.append(chunk)
+                    bin_owners.append((key, index))
+                    if len(bin_chunks) >= batch_size:
+                        flush(bin_chunks, bin_owners, files_done)
+            for bin_chunks, bin_owners in bins:
+                if bin_chunks:
+                    flush(bin_chunks, bin_owners, len(uncached))
         except Exception as e:
             logger.error(f"Error summarizing code: {e}")
-            return "Error generating summary"
+            # Keep the files that were fully summarized before the failure
+            failed.update(key for key in uncached if key not in summaries_by_key
+                          and len(grouped.get(key, ())) != chunk_counts.get(key))
+
+        # Regroup chunk summaries by the file they came from, in chunk order
+        for key, chunk_summaries in grouped.items():
+            if key in failed:
+                continue
+            summary = ' '.join(chunk_summaries[index] for index in sorted(chunk_summaries))
+            self._cache_summary(key, summary)
+            summaries_by_key[key] = summary
+        for key in failed:
+            summaries_by_key[key] = ERROR_SUMMARY
+        return [summaries_by_key.get(key, EMPTY_FILE_SUMMARY) for key in keys]
 
-    def summarize_repo(self, code_list: List[str]) -> str:
+    def summarize_repo(self, code_list: List[str],
+                       progress_callback: Optional[Callable[[int, int, str], None]] = None) -> str:
         """
         Generate a comprehensive summary of the entire repository
         
         Args:
             code_list: List of code contents from different files
+            progress_callback: Called as (done, total, stage) as file summaries complete
+        
+        Returns:
+            str: HTML formatted summary of the repository
+        """
+        logger.info("Generating individual file summaries...")
+        return self.combine_summaries(self.summarize_code_batch(code_list, progress_callback=progress_callback))
+
+    def combine_summaries(self, summaries: List[str]) -> str:
+        """
+        Generate a repository summary from summaries of its files
+        
+        Args:
+            summaries: Per-file summaries, placeholders are skipped
         
         Returns:
             str: HTML formatted summary of the repository
         """
         try:
-            logger.info("Generating individual file summaries...")
-            # Generate summaries for each file
-            file_summaries = []
-            for code in code_list:
-                summary = self.summarize_code(code)
-                if summary and summary != "Error generating summary":
-                    file_summaries.append(summary)
+            # Skip placeholders and keep one copy of each distinct summary
+            file_summaries = list(dict.fromkeys(s for s in summaries if s not in PLACEHOLDER_SUMMARIES))
             
             if not file_summaries:
                 return "<p>No valid code files found to summarize.</p>"
@@ -157,14 +390,19 @@ class LLM_Summarize:
             # Combine all summaries
             combined_summaries = "\n\n".join(file_summaries)
             
+            # File summaries that don't fit in one model input are condensed chunk by
+            # chunk (map-reduce) until they do, instead of being truncated
+            chunks = self._chunk_text(combined_summaries)
+            while len(chunks) > 1:
+                logger.info(f"Condensing {len(chunks)} chunks of file summaries...")
+                combined_summaries = "\n\n".join(
+                    self._summarize(chunks, max_length=REDUCE_MAX_LENGTH, min_length=REDUCE_MIN_LENGTH)
+                )
+                chunks = self._chunk_text(combined_summaries)
+            
             # Generate final repository summary
             logger.info("Generating final repository summary...")
-            final_summary = self.summarizer(
-                combined_summaries,
-                max_length=500,
-                min_length=100,
-                do_sample=False
-            )[0]['summary_text']
+            final_summary = self._summarize([combined_summaries], max_length=500, min_length=100)[0]
             
             # Format as HTML
             html_summary = self._format_as_html(final_summary)
@@ -189,11 +427,7 @@ class LLM_Summarize:
                 formatted_paragraphs.append(f"<h1>{para}</h1>")
             else:
                 # Highlight key terms
-                para = para.replace('Project', '<strong>Project</strong>')
-                para = para.replace('Features', '<strong>Features</strong>')
-                para = para.replace('Technologies', '<strong>Technologies</strong>')
-                para = para.replace('Architecture', '<strong>Architecture</strong>')
-                para = para.replace('Components', '<strong>Components</strong>')
+                para = _KEY_TERMS_RE.sub(r'<strong>\1</strong>', para)
                 formatted_paragraphs.append(f"<p>{para}</p>")
         
         # Add some basic styling
@@ -1,16 +1,121 @@
+import codecs
+import gzip
 import os
 import tempfile
 import shutil
+import sqlite3
+import threading
+from dataclasses import dataclass
+from collections import deque
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from git import Repo
-from pathlib import Path
 import magic
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import re
 import logging
-from llm_summarizer import LLM_Summarize
+from llm_summarizer import LLM_Summarize, SHORT_FILE_SUMMARY
 from tqdm import tqdm
 import hashlib
 import json
+try:
+    import orjson
+except ImportError:  # Optional, the standard json module is used without it
+    orjson = None
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+# Directories whose files are never analyzed
+SKIP_DIRS = frozenset({
+    '.git', 'node_modules', '__pycache__', 'venv', 'env', 'dist', 'build',
+    'target', '.idea', '.vscode', 'coverage', 'docs', 'tests', 'test'
+})
+
+# Extensions of generated, binary or otherwise uninteresting files
+SKIP_EXTENSIONS = frozenset({
+    '.min.js', '.min.css', '.map', '.lock', '.log', '.sqlite', '.db',
+    '.pyc', '.pyo', '.pyd', '.so', '.dll', '.dylib'
+})
+
+# Language reported for each file extension, anything else is 'Unknown'
+EXT_TO_LANG = {
+    '.py': 'Python',
+    '.js': 'JavaScript', '.jsx': 'JavaScript',
+    '.ts': 'TypeScript', '.tsx': 'TypeScript',
+    '.java': 'Java',
+    '.cpp': 'C++', '.cc': 'C++', '.cxx': 'C++',
+    '.c': 'C',
+    '.go': 'Go',
+    '.rb': 'Ruby',
+    '.html': 'HTML', '.htm': 'HTML',
+    '.css': 'CSS',
+    '.md': 'Markdown',
+    '.json': 'JSON',
+    '.xml': 'XML',
+    '.yaml': 'YAML', '.yml': 'YAML',
+}
+
+# Files larger than this are skipped
+MAX_FILE_SIZE = 100 * 1024  # 100KB
+
+# Number of leading bytes inspected to tell text files from binary ones
+TEXT_SNIFF_BYTES = 4096
+
+# Number of files handed to the summarizer per batch
+SUMMARY_BATCH_FILES = 32
+
+# Only the HEAD working tree is analyzed, so history, old blobs, tags and other branches
+# are never fetched
+CLONE_OPTIONS = ['--depth=1', '--filter=blob:none', '--single-branch', '--no-tags']
+
+# GitHub repositories are listed through the REST API and only the files that pass the
+# filters are downloaded, other URLs are cloned. GITHUB_TOKEN (if set) raises the API rate
+# limit and gives access to private repositories
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+_GITHUB_REPO_RE = re.compile(r'^(?:https?://)?(?:www\.)?github\.com/([\w.-]+)/([\w.-]+?)(?:\.git)?/?$')
+
+# Concurrent file downloads from GitHub
+DOWNLOAD_WORKERS = 16
+
+# Seconds to wait for a GitHub response
+HTTP_TIMEOUT = 30
+
+# Compression level of the summaries cache files (speed over size)
+CACHE_COMPRESS_LEVEL = 3
+
+# Only the head and tail of longer files are sent to the LLM
+CLIP_HEAD_CHARS = 8192
+CLIP_TAIL_CHARS = 2048
+
+# Per-file metadata cache (in the cache directory), shared by all analyzed repositories
+FILE_META_DB = "file_meta.sqlite"
+
+# Bump whenever the cached values are derived differently (line counting, short-file rule),
+# so rows computed under the old rules are dropped instead of served
+FILE_META_VERSION = 2
+FILE_META_TABLE = f"file_meta_v{FILE_META_VERSION}"
+
+# Rows kept in the metadata cache, the oldest inserted ones are evicted beyond that
+FILE_META_MAX_ROWS = 200_000
+
+# Files whose metadata and content may be read ahead of the file being processed
+READ_AHEAD_FILES = 64
+
+# Summary batches queued for the LLM worker before file processing waits for it
+MAX_QUEUED_BATCHES = 2
+
+# The terminal progress bar is advanced this many files at a time
+PROGRESS_BATCH_FILES = 16
+
+# Worker threads that scan directories concurrently
+WALK_WORKERS = 8
+
+# Directories nested deeper than this below the repository root are not scanned
+MAX_WALK_DEPTH = 32
+
+# Start of a line of code, i.e. a non-blank line that does not open with a comment marker
+_CODE_LINE_RE = re.compile(r'^[^\S\n]*(?!#|//|/\*|\*)\S', re.M)
 
 # Configure logging
 logging.basicConfig(
@@ -19,211 +124,434 @@ logging.basicConfig(
 )
 logger = logging.getLogger("GitHubScraper")
 
+def _has_skipped_extension(name: str) -> bool:
+    """Check a file name's extension, and its double extension such as .min.js, against SKIP_EXTENSIONS."""
+    stem, ext = os.path.splitext(name.lower())
+    return ext in SKIP_EXTENSIONS or os.path.splitext(stem)[1] + ext in SKIP_EXTENSIONS
+
+def _clip(content: str) -> str:
+    """Keep the head and tail of long file contents, marking where the middle was cut."""
+    if len(content) <= CLIP_HEAD_CHARS + CLIP_TAIL_CHARS:
+        return content
+    return content[:CLIP_HEAD_CHARS] + '\n...[TRUNCATED]...\n' + content[-CLIP_TAIL_CHARS:]
+
+def _bounded_map(pool: ThreadPoolExecutor, fn: Callable, items: Iterable, window: int) -> Iterator[Any]:
+    """Like pool.map, but with at most `window` results computed ahead of the consumer."""
+    futures = deque()
+    for item in items:
+        futures.append(pool.submit(fn, item))
+        if len(futures) >= window:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+@dataclass(frozen=True)
+class FileMeta:
+    """A file that passed should_skip_file, with the metadata the walk already read."""
+    path: str
+    size: int
+
 class GitHubScraper:
-    def __init__(self):
+    def __init__(self, summarizer: Optional[LLM_Summarize] = None):
+        """
+        Args:
+            summarizer: Preloaded summarizer to reuse. If None, a new one is created
+        """
         self.temp_dir = None
         self.repo_path = None
         self.cache_dir = os.path.join(os.path.expanduser("~"), ".git_analyzer_cache")
         os.makedirs(self.cache_dir, exist_ok=True)
-        
-        # Initialize the LLM summarizer
-        try:
-            self.summarizer = LLM_Summarize()
-            logger.info("Successfully initialized LLM summarizer")
-        except Exception as e:
-            logger.error(f"Failed to initialize LLM summarizer: {e}")
-            raise
+
+        # libmagic handles are not shared between threads (each one serializes its calls)
+        self._magic_local = threading.local()
+
+        # Metadata of unchanged files is served from sqlite, keyed by (path, git blob sha)
+        # since every analysis works on a fresh clone with new paths and mtimes
+        self._file_meta_db = os.path.join(self.cache_dir, FILE_META_DB)
+        self._blob_shas: Dict[str, str] = {}
+        self._file_meta: Dict[Tuple[str, str], Tuple[str, Optional[int]]] = {}
+        self._new_file_meta: List[Tuple] = []
+
+        # Initialize the LLM summarizer unless one was injected
+        if summarizer is None:
+            try:
+                summarizer = LLM_Summarize()
+                logger.info("Successfully initialized LLM summarizer")
+            except Exception as e:
+                logger.error(f"Failed to initialize LLM summarizer: {e}")
+                raise
+        self.summarizer = summarizer
 
     def get_cache_key(self, repo_url: str) -> str:
         """Generate a cache key for the repository."""
-        return hashlib.md5(repo_url.encode()).hexdigest()
+        return hashlib.blake2b(repo_url.encode(), digest_size=16).hexdigest()
+
+    def _cache_file(self, repo_url: str) -> str:
+        """Path of the compressed summaries cache file for the repository."""
+        return os.path.join(self.cache_dir, f"{self.get_cache_key(repo_url)}.json.gz")
 
     def get_cached_summaries(self, repo_url: str) -> Optional[Tuple[List[Dict], int]]:
         """Get cached summaries if they exist."""
-        cache_key = self.get_cache_key(repo_url)
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
+        cache_file = self._cache_file(repo_url)
         
         if os.path.exists(cache_file):
             try:
-                with open(cache_file, 'r') as f:
-                    data = json.load(f)
-                    logger.info("Using cached summaries")
-                    return data['summaries'], data['total_files']
+                with gzip.open(cache_file, 'rb') as f:
+                    raw = f.read()
+                data = orjson.loads(raw) if orjson else json.loads(raw)
+                logger.info("Using cached summaries")
+                return data['summaries'], data['total_files']
             except Exception as e:
                 logger.error(f"Error reading cache: {e}")
         return None
 
     def save_to_cache(self, repo_url: str, summaries: List[Dict], total_files: int):
         """Save summaries to cache."""
-        cache_key = self.get_cache_key(repo_url)
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
+        cache_file = self._cache_file(repo_url)
+        data = {
+            'summaries': summaries,
+            'total_files': total_files
+        }
         
+        # Write to a temporary file and swap it in, so readers never see a partial cache
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(cache_file, 'w') as f:
-                json.dump({
-                    'summaries': summaries,
-                    'total_files': total_files
-                }, f)
+            raw = orjson.dumps(data) if orjson else json.dumps(data).encode('utf-8')
+            with gzip.open(tmp_file, 'wb', compresslevel=CACHE_COMPRESS_LEVEL) as f:
+                f.write(raw)
+            os.replace(tmp_file, cache_file)
             logger.info("Saved summaries to cache")
         except Exception as e:
             logger.error(f"Error saving to cache: {e}")
+            if os.path.exists(tmp_file):
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+
+    def _load_file_meta(self) -> None:
+        """Load cached metadata for the files checked out in the repository."""
+        self._file_meta = {}
+        self._new_file_meta = []
+        if not self._blob_shas:
+            return
+            
+        try:
+            with closing(sqlite3.connect(self._file_meta_db)) as conn, conn:
+                # Tables of other cache versions hold values derived under other rules
+                stale = conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'file_meta%' AND name != ?",
+                    (FILE_META_TABLE,)
+                ).fetchall()
+                for (name,) in stale:
+                    conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {FILE_META_TABLE} (path TEXT, sha TEXT, size INTEGER, "
+                    f"mime TEXT, loc INTEGER, PRIMARY KEY (path, sha))"
+                )
+                shas = list(set(self._blob_shas.values()))
+                # Stay under sqlite's limit on bound parameters per statement
+                for start in range(0, len(shas), 500):
+                    chunk = shas[start:start + 500]
+                    rows = conn.execute(
+                        f"SELECT path, sha, mime, loc FROM {FILE_META_TABLE} "
+                        f"WHERE sha IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                    for path, sha, mime, loc in rows:
+                        self._file_meta[(path, sha)] = (mime, loc)
+            logger.info(f"Loaded cached metadata for {len(self._file_meta)} files")
+        except Exception as e:
+            logger.error(f"Error reading file metadata cache: {e}")
+
+    def _save_file_meta(self) -> None:
+        """Write the metadata collected for uncached files in a single transaction."""
+        if not self._new_file_meta:
+            return
+        try:
+            with closing(sqlite3.connect(self._file_meta_db)) as conn, conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {FILE_META_TABLE} (path, sha, size, mime, loc) VALUES (?, ?, ?, ?, ?)",
+                    self._new_file_meta
+                )
+                # Replaced rows get a new rowid, so the lowest rowids are the oldest entries
+                conn.execute(
+                    f"DELETE FROM {FILE_META_TABLE} WHERE rowid <= "
+                    f"(SELECT MAX(rowid) FROM {FILE_META_TABLE}) - ?", (FILE_META_MAX_ROWS,)
+                )
+            self._new_file_meta = []
+        except Exception as e:
+            logger.error(f"Error saving file metadata cache: {e}")
 
     def clone_repository(self, repo_url: str) -> None:
-        """Clone the GitHub repository to a temporary directory."""
+        """
+        Fetch the repository into a temporary directory.
+        
+        GitHub repositories are downloaded file by file through the API, falling back
+        to a git clone when that fails or for any other URL.
+        """
         try:
             self.temp_dir = tempfile.mkdtemp()
-            logger.info(f"Cloning repository to {self.temp_dir}")
-            Repo.clone_from(repo_url, self.temp_dir)
             self.repo_path = self.temp_dir
+            
+            match = _GITHUB_REPO_RE.match(repo_url.strip())
+            if match:
+                try:
+                    self._download_from_github(*match.groups())
+                    return
+                except Exception as e:
+                    logger.warning(f"GitHub API download failed, cloning instead: {e}")
+                    shutil.rmtree(self.temp_dir, ignore_errors=True)
+                    self.temp_dir = self.repo_path = tempfile.mkdtemp()
+                    
+            logger.info(f"Cloning repository to {self.temp_dir}")
+            repo = Repo.clone_from(repo_url, self.temp_dir, multi_options=CLONE_OPTIONS)
             logger.info("Repository cloned successfully")
+            
+            try:
+                self._blob_shas = {path: entry.hexsha for (path, _), entry in repo.index.entries.items()}
+            except Exception as e:
+                logger.warning(f"Could not read git index, file metadata cache disabled: {e}")
+                self._blob_shas = {}
         except Exception as e:
             logger.error(f"Failed to clone repository: {e}")
             raise
 
+    def _github_get(self, url: str, accept: str = "application/vnd.github+json") -> bytes:
+        """GET a GitHub URL, authenticating with GITHUB_TOKEN when it is set."""
+        headers = {'Accept': accept}
+        token = os.environ.get('GITHUB_TOKEN')
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        with urlopen(Request(url, headers=headers), timeout=HTTP_TIMEOUT) as response:
+            return response.read()
+
+    def _should_skip_tree_entry(self, entry: Dict) -> bool:
+        """Apply the same filters as the directory walk to a Trees API entry, before downloading it."""
+        # Symlinks (mode 120000) and submodules are not followed
+        if entry['type'] != 'blob' or entry['mode'] == '120000':
+            return True
+            
+        parts = entry['path'].split('/')
+        if len(parts) - 1 > MAX_WALK_DEPTH:
+            return True
+        if any(part.startswith('.') for part in parts) or not SKIP_DIRS.isdisjoint(parts[:-1]):
+            return True
+        if _has_skipped_extension(parts[-1]):
+            return True
+        return entry.get('size', 0) > MAX_FILE_SIZE
+
+    def _download_from_github(self, owner: str, repo: str) -> None:
+        """
+        Download the files of a GitHub repository's HEAD commit that pass the filters.
+        
+        Args:
+            owner: Repository owner
+            repo: Repository name
+        """
+        api_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
+        commit_sha = self._github_get(f"{api_url}/commits/HEAD", accept="application/vnd.github.sha").decode().strip()
+        tree = json.loads(self._github_get(f"{api_url}/git/trees/{commit_sha}?recursive=1"))
+        if tree.get('truncated'):
+            raise ValueError("repository tree is too large for the Trees API")
+            
+        entries = [entry for entry in tree['tree'] if not self._should_skip_tree_entry(entry)]
+        logger.info(f"Downloading {len(entries)} of {len(tree['tree'])} tree entries from GitHub")
+        
+        def download(path: str) -> None:
+            target = os.path.join(self.repo_path, *path.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(self._github_get(f"{GITHUB_RAW_URL}/{owner}/{repo}/{commit_sha}/{quote(path)}", accept="*/*"))
+                
+        # Files are written to the temporary directory, so the walk and the metadata cache
+        # work the same as for a clone
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+            list(pool.map(download, [entry['path'] for entry in entries]))
+        self._blob_shas = {entry['path']: entry['sha'] for entry in entries}
+        logger.info("Repository downloaded successfully")
+
+    def _get_magic(self) -> magic.Magic:
+        """Get this thread's libmagic handle, loading the database only once per thread."""
+        mime = getattr(self._magic_local, 'mime', None)
+        if mime is None:
+            mime = self._magic_local.mime = magic.Magic(mime=True)
+        return mime
+
     def get_file_type(self, file_path: str) -> str:
         """Determine the type of file using python-magic."""
         try:
-            mime = magic.Magic(mime=True)
-            return mime.from_file(file_path)
+            return self._get_magic().from_file(file_path)
         except Exception as e:
             logger.error(f"Error determining file type for {file_path}: {e}")
             return "application/octet-stream"
 
     def is_text_file(self, file_path: str) -> bool:
-        """Check if the file is a text file."""
+        """Check if the file is a text file by sniffing its first bytes."""
         try:
-            mime = self.get_file_type(file_path)
-            return mime.startswith('text/') or mime in ['application/json', 'application/xml']
+            with open(file_path, 'rb') as f:
+                head = f.read(TEXT_SNIFF_BYTES)
+            # Empty files have nothing to analyze; NUL bytes mean binary. The incremental
+            # decoder tolerates a multi-byte character cut off at the end of the head.
+            is_text = bool(head) and b'\x00' not in head
+            if is_text:
+                codecs.getincrementaldecoder('utf-8')().decode(head)
+        except UnicodeDecodeError:
+            is_text = False
         except Exception as e:
             logger.error(f"Error checking if file is text: {e}")
-            return False
+            is_text = False
+        return is_text
 
-    def should_skip_file(self, file_path: str) -> bool:
+    def should_skip_file(self, entry: os.DirEntry) -> bool:
         """Determine if a file should be skipped based on various criteria."""
-        # Skip hidden files and directories
-        if any(part.startswith('.') for part in Path(file_path).parts):
-            return True
-            
-        # Skip binary files
-        if not self.is_text_file(file_path):
+        # Cheap checks run first so only surviving files are opened. Hidden and skipped
+        # directories are already pruned by _scan_directory.
+        
+        # Skip hidden files
+        if entry.name.startswith('.'):
             return True
             
-        # Skip files in certain directories
-        skip_dirs = {
-            '.git', 'node_modules', '__pycache__', 'venv', 'env', 'dist', 'build',
-            'target', '.idea', '.vscode', 'coverage', 'docs', 'tests', 'test'
-        }
-        if any(skip_dir in Path(file_path).parts for skip_dir in skip_dirs):
+        # Skip files with certain extensions
+        if _has_skipped_extension(entry.name):
             return True
             
         # Skip files larger than 100KB
         try:
-            if os.path.getsize(file_path) > 100 * 1024:  # 100KB
+            if entry.stat(follow_symlinks=False).st_size > MAX_FILE_SIZE:
                 return True
         except Exception:
             return True
             
-        # Skip files with certain extensions
-        skip_extensions = {
-            '.min.js', '.min.css', '.map', '.lock', '.log', '.sqlite', '.db',
-            '.pyc', '.pyo', '.pyd', '.so', '.dll', '.dylib'
-        }
-        if Path(file_path).suffix.lower() in skip_extensions:
+        # Skip binary files
+        if not self.is_text_file(entry.path):
             return True
             
         return False
 
-    def get_file_summary(self, file_path: str) -> Dict:
-        """Generate a summary for a single file."""
+    def get_file_summary(self, file: FileMeta) -> Tuple[Dict, Optional[str]]:
+        """
+        Collect metadata for a single file.
+        
+        Args:
+            file: File found by get_all_files, which already checked that it is text
+            
+        Returns:
+            Tuple[Dict, Optional[str]]: The file's summary dict, and its content if it is
+            a readable text file longer than 3 lines. Files with more than 5 lines of code
+            are summarized by the LLM later (the summary itself is filled in then)
+        """
         try:
-            file_stats = os.stat(file_path)
-            file_size = file_stats.st_size
-            file_type = self.get_file_type(file_path)
+            file_path = file.path
+            rel_path = os.path.relpath(file_path, self.repo_path)
+            meta_path = rel_path.replace(os.sep, '/')
+            blob_sha = self._blob_shas.get(meta_path)
+            cached = self._file_meta.get((meta_path, blob_sha)) if blob_sha else None
             
             summary = {
-                'path': os.path.relpath(file_path, self.repo_path),
-                'size': file_size,
-                'type': file_type,
-                'is_text': self.is_text_file(file_path),
+                'path': rel_path,
+                'size': file.size,
+                'type': cached[0] if cached else self.get_file_type(file_path),
+                # get_all_files only yields text files
+                'is_text': True,
                 'summary': None
             }
 
-            if summary['is_text']:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    lines = content.split('\n')
-                    
-                    # Skip single line files or very short files
-                    if len(lines) <= 3:
-                        summary['summary'] = "File too short - skipping summary"
-                        return summary
-                    
-                    # Count lines of code (excluding comments and empty lines)
-                    summary['loc'] = len([l for l in lines if l.strip() and not l.strip().startswith(('#', '//', '/*', '*', '*/'))])
-                    
-                    # Only generate summary for files with significant content
-                    if summary['loc'] > 5:
-                        # Generate summary using the LLM
-                        summary['summary'] = self.summarizer.summarize_code(content)
-                    
-                    # Try to detect language based on file extension
-                    ext = os.path.splitext(file_path)[1].lower()
-                    if ext in ['.py']:
-                        summary['language'] = 'Python'
-                    elif ext in ['.js', '.jsx']:
-                        summary['language'] = 'JavaScript'
-                    elif ext in ['.ts', '.tsx']:
-                        summary['language'] = 'TypeScript'
-                    elif ext in ['.java']:
-                        summary['language'] = 'Java'
-                    elif ext in ['.cpp', '.cc', '.cxx']:
-                        summary['language'] = 'C++'
-                    elif ext in ['.c']:
-                        summary['language'] = 'C'
-                    elif ext in ['.go']:
-                        summary['language'] = 'Go'
-                    elif ext in ['.rb']:
-                        summary['language'] = 'Ruby'
-                    elif ext in ['.html', '.htm']:
-                        summary['language'] = 'HTML'
-                    elif ext in ['.css']:
-                        summary['language'] = 'CSS'
-                    elif ext in ['.md']:
-                        summary['language'] = 'Markdown'
-                    elif ext in ['.json']:
-                        summary['language'] = 'JSON'
-                    elif ext in ['.xml']:
-                        summary['language'] = 'XML'
-                    elif ext in ['.yaml', '.yml']:
-                        summary['language'] = 'YAML'
-                    else:
-                        summary['language'] = 'Unknown'
-
-            return summary
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+                
+            # Skip single line files or very short files (3 lines or fewer), their
+            # content is never summarized so it isn't decoded either. Line breaks are
+            # counted like text mode's universal newlines (\n, \r\n and lone \r)
+            if raw.count(b'\n') + raw.count(b'\r') - raw.count(b'\r\n') <= 2:
+                summary['summary'] = SHORT_FILE_SUMMARY
+                if not cached:
+                    self._remember_file_meta(meta_path, blob_sha, summary)
+                return summary, None
+                
+            content = raw.decode('utf-8', errors='ignore')
+            if '\r' in content:
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
+            
+            # Count lines of code (excluding comments and empty lines)
+            summary['loc'] = cached[1] if cached else len(_CODE_LINE_RE.findall(content))
+            
+            # Try to detect language based on file extension
+            summary['language'] = EXT_TO_LANG.get(os.path.splitext(file_path)[1].lower(), 'Unknown')
+
+            if not cached:
+                self._remember_file_meta(meta_path, blob_sha, summary)
+            return summary, content
         except Exception as e:
-            logger.error(f"Error processing file {file_path}: {e}")
+            logger.error(f"Error processing file {file.path}: {e}")
             return {
-                'path': os.path.relpath(file_path, self.repo_path),
+                'path': os.path.relpath(file.path, self.repo_path),
                 'error': str(e)
-            }
+            }, None
 
-    def get_all_files(self) -> List[str]:
+    def _remember_file_meta(self, meta_path: str, blob_sha: Optional[str], summary: Dict) -> None:
+        """Queue a file's metadata for the sqlite cache (list.append is thread safe)."""
+        if blob_sha:
+            self._new_file_meta.append((
+                meta_path, blob_sha, summary['size'], summary['type'], summary.get('loc')
+            ))
+
+    def _scan_directory(self, directory: str) -> Tuple[List[FileMeta], List[str]]:
+        """Scan one directory.
+        
+        Args:
+            directory: Directory to scan
+            
+        Returns:
+            Tuple of (files to analyze, subdirectories to descend into)
+        """
+        files, subdirs = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.') and entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and not self.should_skip_file(entry):
+                    # stat() was cached on the entry by should_skip_file
+                    files.append(FileMeta(entry.path, entry.stat(follow_symlinks=False).st_size))
+        return files, subdirs
+
+    def get_all_files(self) -> List[FileMeta]:
         """Get all files in the repository that should be analyzed."""
         if not self.repo_path:
             raise ValueError("Repository not cloned. Call clone_repository first.")
             
+        # Breadth-first walk where every directory is scanned on the pool, so the
+        # readdir, stat and text sniffing calls of sibling directories overlap
         files_to_analyze = []
-        for root, _, files in os.walk(self.repo_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if not self.should_skip_file(file_path):
-                    files_to_analyze.append(file_path)
+        with ThreadPoolExecutor(max_workers=WALK_WORKERS) as pool:
+            pending = {pool.submit(self._scan_directory, self.repo_path): 0}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = pending.pop(future)
+                    try:
+                        files, subdirs = future.result()
+                    except OSError as e:
+                        logger.warning(f"Error scanning directory: {e}")
+                        continue
+                    files_to_analyze.extend(files)
+                    if depth < MAX_WALK_DEPTH:
+                        for subdir in subdirs:
+                            pending[pool.submit(self._scan_directory, subdir)] = depth + 1
+                            
+        # Completion order varies between runs, keep the result stable
+        files_to_analyze.sort(key=lambda file: file.path)
         return files_to_analyze
 
-    def analyze_repository(self, repo_url: str) -> Tuple[List[Dict], int]:
+    def analyze_repository(self, repo_url: str,
+                           progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Tuple[List[Dict], int]:
         """
         Analyze all files in the repository.
         
+        Args:
+            repo_url: URL of the repository, used as the cache key
+            progress_callback: Called as (done, total, stage) while files are analyzed and summarized
+        
         Returns:
             Tuple[List[Dict], int]: List of summaries and total number of files analyzed
         """
@@ -236,7 +564,6 @@ class GitHubScraper:
             raise ValueError("Repository not cloned. Call clone_repository first.")
 
         summaries = []
-        code_contents = []
         
         try:
             # Get all files to analyze
@@ -248,20 +575,66 @@ class GitHubScraper:
                 return [], 0
             
             logger.info(f"Found {total_files} files to analyze")
+            self._load_file_meta()
             
-            # Analyze each file
-            for file_path in tqdm(files_to_analyze, desc="Analyzing files"):
-                summary = self.get_file_summary(file_path)
-                summaries.append(summary)
+            # Collect metadata for each file on a thread pool (libmagic and file reads release
+            # the GIL) while a background worker summarizes eligible files in micro-batches,
+            # so file I/O overlaps with the model. Both stages are bounded, so only a fixed
+            # number of file contents is held in memory however large the repository is
+            pending = []
+            batches = deque()
+            files_summarized = total_pending = 0
+            # Not a with block: leaving one joins the worker, so an error or a Streamlit
+            # stop would wait for every queued summary batch to finish generating
+            llm_worker = ThreadPoolExecutor(max_workers=1)
+            try:
+                with ThreadPoolExecutor(max_workers=os.cpu_count()) as file_pool, \
+                        tqdm(total=total_files, desc="Analyzing files", mininterval=0.5) as progress_bar:
+                    file_results = _bounded_map(file_pool, self.get_file_summary, files_to_analyze, READ_AHEAD_FILES)
+                    for done, (summary, content) in enumerate(file_results, 1):
+                        # Only generate summary for files with significant content
+                        if content is not None and summary.get('loc', 0) > 5:
+                            pending.append((len(summaries), _clip(content)))
+                        summaries.append(summary)
+                        if progress_callback:
+                            progress_callback(done, total_files, "Analyzing files")
+                        if done % PROGRESS_BATCH_FILES == 0 or done == total_files:
+                            progress_bar.update(done - progress_bar.n)
+                        
+                        if len(pending) >= SUMMARY_BATCH_FILES:
+                            # Wait for the model once enough batches are queued for it
+                            if len(batches) >= MAX_QUEUED_BATCHES:
+                                batch, count = batches.popleft()
+                                batch.result()
+                                files_summarized += count
+                            batches.append((llm_worker.submit(self._summarize_pending, summaries, pending), len(pending)))
+                            total_pending += len(pending)
+                            pending = []
                 
-                if summary['is_text'] and not summary.get('error'):
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        code_contents.append(f.read())
+                if pending:
+                    batches.append((llm_worker.submit(self._summarize_pending, summaries, pending), len(pending)))
+                    total_pending += len(pending)
+                
+                # Progress is reported from this thread, since UI callbacks can't run on the worker
+                while batches:
+                    batch, count = batches.popleft()
+                    batch.result()
+                    files_summarized += count
+                    if progress_callback:
+                        progress_callback(files_summarized, total_pending, "Summarizing files")
+            except BaseException:
+                for batch, _ in batches:
+                    batch.cancel()
+                llm_worker.shutdown(wait=False, cancel_futures=True)
+                raise
+            llm_worker.shutdown()
 
-            # Generate overall repository summary
-            if code_contents:
+            # Generate overall repository summary from the file summaries, rather than
+            # summarizing every file's code a second time
+            file_summaries = [summary['summary'] for summary in summaries if summary.get('summary')]
+            if file_summaries:
                 logger.info("Generating repository summary...")
-                repo_summary = self.summarizer.summarize_repo(code_contents)
+                repo_summary = self.summarizer.combine_summaries(file_summaries)
                 summaries.append({
                     'path': 'REPOSITORY_SUMMARY',
                     'summary': repo_summary,
@@ -270,6 +643,7 @@ class GitHubScraper:
                 logger.info("Repository summary generated successfully")
 
             # Save to cache
+            self._save_file_meta()
             self.save_to_cache(repo_url, summaries, total_files)
 
             return summaries, total_files
@@ -278,6 +652,12 @@ class GitHubScraper:
             logger.error(f"Error analyzing repository: {e}")
             raise
 
+    def _summarize_pending(self, summaries: List[Dict], pending: List[Tuple[int, str]]) -> None:
+        """Summarize a micro-batch of (index, content) pairs and write results back by index."""
+        file_summaries = self.summarizer.summarize_code_batch([content for _, content in pending])
+        for (index, _), file_summary in zip(pending, file_summaries):
+            summaries[index]['summary'] = file_summary
+
     def cleanup(self):
         """Clean up temporary directory."""
         if self.temp_dir and os.path.exists(self.temp_dir):
@@ -314,8 +694,11 @@ def main():
                     continue
                     
                 print(f"\nFile: {summary['path']}")
-                print(f"Type: {summary['type']}")
-                print(f"Size: {summary['size']} bytes")
+                if 'type' in summary:
+                    print(f"Type: {summary['type']}")
+                
+                if 'size' in summary:
+                    print(f"Size: {summary['size']} bytes")
                 
                 if 'language' in summary:
                     print(f"Language: {summary['language']}")
@@ -323,7 +706,7 @@ def main():
                 if 'loc' in summary:
                     print(f"Lines of Code: {summary['loc']}")
                 
-                if summary['is_text'] and summary['summary']:
+                if summary.get('is_text') and summary.get('summary'):
                     print("\nSummary:")
                     print("-" * 40)
                     print(summary['summary'])